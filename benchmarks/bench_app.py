@@ -0,0 +1,21 @@
+"""シミュレーション画面の再実行(rerun)時間のベンチマーク(Streamlit AppTest)"""
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from conftest import make_landowners
+
+APP_PATH = os.path.join(os.path.dirname(__file__), os.pardir, "zigyokeikaku.py")
+
+
+@pytest.mark.parametrize("n", [10, 1_000, 10_000])
+def test_simulation_page_rerun(benchmark, tmp_path, monkeypatch, n):
+    # アプリは作業ディレクトリに biz_plan.db を作るので一時ディレクトリで実行する
+    monkeypatch.chdir(tmp_path)
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    at.session_state["input_df"] = make_landowners(n)
+    at.run()
+    assert not at.exception
+    benchmark.pedantic(at.run, rounds=5, warmup_rounds=1)
+    assert not at.exception
@@ -0,0 +1,109 @@
+"""地権者計算表(calc_df)とPL・インセンティブ計算のベンチマーク"""
+import numpy as np
+import pytest
+
+import zigyokeikaku as z
+from conftest import LANDOWNER_SIZES, make_landowners
+
+
+@pytest.mark.parametrize("n", LANDOWNER_SIZES)
+def test_build_calc_df(benchmark, n):
+    # キャッシュを通さない計算そのものの時間
+    landowners = make_landowners(n)
+    calc_df = benchmark(z._build_calc_df, landowners, 3.0)
+    assert len(calc_df) == n
+
+
+@pytest.mark.parametrize("n", LANDOWNER_SIZES)
+def test_build_calc_df_cached(benchmark, n):
+    # 再実行(rerun)時: 入力のハッシュ照合だけで済む場合
+    landowners = make_landowners(n)
+    z.build_calc_df(landowners, 3.0)
+    benchmark(z.build_calc_df, landowners, 3.0)
+
+
+@pytest.mark.parametrize("n", LANDOWNER_SIZES)
+def test_incremental_calc_df_edit(benchmark, n):
+    # 1セル編集時: 変更行だけ再計算して合計を差分で更新
+    landowners = make_landowners(n)
+    edited = landowners.copy()
+    edited.iat[n // 2, 3] = 999
+    session = {}
+    z.incremental_calc_df(session, landowners, landowners, None, 3.0)
+    states = iter([{"edited_rows": {n // 2: {"提案金額(坪)": 999}}}, {"edited_rows": {}}] * 100_000)
+    def edit():
+        state = next(states)
+        return z.incremental_calc_df(session, landowners, edited if state["edited_rows"] else landowners, state, 3.0)
+    calc_df, totals = benchmark(edit)
+    assert totals["total_offer"] == pytest.approx(calc_df["提案金額(グロス)"].sum())
+
+
+@pytest.mark.parametrize("n", LANDOWNER_SIZES)
+def test_calc_df_pipeline(benchmark, n):
+    # 入力表 → calc_df → 集計 → PL計算 の一連の流れ
+    landowners = make_landowners(n)
+    def pipeline():
+        calc_df = z._build_calc_df(landowners, 3.0)
+        rate = z.get_adjusted_incentive_rate("PM S1", False, False)
+        return z.compute_plan({
+            "total_area": calc_df["面積(坪)"].sum(),
+            "total_offer": calc_df["提案金額(グロス)"].sum(),
+            "incentive_rate": rate,
+        })
+    plan = benchmark(pipeline)
+    assert plan["exit_gross"] > 0
+
+
+def test_compute_plan(benchmark):
+    plan = benchmark(z.compute_plan, {"total_area": 80.0, "total_offer": 18800.0, "incentive_rate": 0.10})
+    assert plan["pj_net_profit"] == pytest.approx(3959.2)
+
+
+@pytest.mark.parametrize("n", [1_000, 100_000])
+def test_compute_plans(benchmark, n):
+    rng = np.random.default_rng(0)
+    arrays = {
+        "total_area": rng.uniform(50, 500, n),
+        "total_offer": rng.uniform(10_000, 200_000, n),
+        "exit_unit_price": rng.uniform(80, 150, n),
+        "incentive_rate": 0.10,
+    }
+    plans = benchmark(z.compute_plans, arrays)
+    assert plans["pj_net_profit"].shape == (n,)
+
+
+def test_incentive_rates(benchmark):
+    # 等級×単独PM×第三者契約の全組み合わせを1回の配列演算で引く
+    grades = np.array(z.INCENTIVE_RULES[z.INCENTIVE_RULE_YEAR]["grades"], dtype=object)[:, 0]
+    solo = np.array([False, True])
+    third = np.array([False, True])
+    rates = benchmark(z.incentive_rates, grades[:, None, None], solo[None, :, None], third[None, None, :])
+    assert rates.shape == (len(grades), 2, 2)
+
+
+@pytest.mark.parametrize("n", [1_000, 100_000])
+def test_incentive_rates_scenarios(benchmark, n):
+    rng = np.random.default_rng(0)
+    grades = rng.choice(list(z.incentive_table()["grades"]) + ["未設定"], n)
+    solo = rng.random(n) < 0.5
+    third = rng.random(n) < 0.5
+    rates = benchmark(z.incentive_rates, grades, solo, third)
+    assert rates.shape == (n,)
+
+
+# 16コアで100万回を2秒以内に終えるのに必要な、1プロセスあたりの処理速度(回/秒)
+RISK_DRAWS_PER_WORKER_SECOND = 1_000_000 / 16 / 2
+
+
+def test_simulate_plans_throughput(benchmark):
+    # 地権者300件・5項目すべてを分布で引く場合の1プロセスの処理速度(並列時はこれがワーカー数倍になる)
+    landowners = make_landowners(300)
+    owner_offer_gross = (landowners["面積(坪)"] * landowners["提案金額(坪)"]).to_numpy()
+    base = dict(z.PLAN_INPUT_DEFAULTS, total_area=landowners["面積(坪)"].sum(), total_offer=owner_offer_gross.sum(), incentive_rate=0.10)
+    specs = {key: {"dist": "正規分布", "spread": 10.0}
+             for key in ("exit_unit_price", "far", "project_months", "loan_interest_rate", "offer_price")}
+    n_draws = 200_000
+    results = benchmark.pedantic(z.simulate_plans, args=(base, specs, owner_offer_gross, n_draws), rounds=3)
+    assert len(results["pj_net_profit"]) == n_draws
+    if not benchmark.disabled:
+        assert n_draws / benchmark.stats.stats.min >= RISK_DRAWS_PER_WORKER_SECOND
@@ -0,0 +1,78 @@
+"""保存・読み込み(SQLite)のベンチマーク(地権者10件〜10万件の合成データベース)"""
+import zipfile
+
+import pytest
+
+import zigyokeikaku as z
+from conftest import LANDOWNER_SIZES, make_landowners
+
+
+@pytest.mark.parametrize("n", LANDOWNER_SIZES)
+def test_save_project(benchmark, temp_db, n):
+    landowners = make_landowners(n)
+    # 同名上書きでDBの大きさを一定に保つ
+    project_id = benchmark(z.save_project, "ベンチマーク", landowners["面積(坪)"].sum(), 300.0, 100, landowners, overwrite=True)
+    assert len(z.get_landowners_by_project(project_id)) == n
+
+
+@pytest.mark.parametrize("synthetic_db", LANDOWNER_SIZES, indirect=True)
+def test_get_all_projects(benchmark, synthetic_db):
+    projects = benchmark(z.get_all_projects)
+    assert len(projects) == -(-synthetic_db // 100)
+
+
+@pytest.mark.parametrize("synthetic_db", LANDOWNER_SIZES, indirect=True)
+def test_get_landowners_by_project(benchmark, synthetic_db):
+    project_id = int(z.get_all_projects()["id"].iloc[0])
+    landowners = benchmark(z.get_landowners_by_project, project_id)
+    assert 0 < len(landowners) <= 100
+
+
+@pytest.mark.parametrize("synthetic_db", LANDOWNER_SIZES, indirect=True)
+def test_get_projects_page(benchmark, synthetic_db):
+    page = benchmark(z.get_projects_page)
+    assert len(page) == min(z.PROJECTS_PAGE_SIZE, -(-synthetic_db // 100))
+
+
+@pytest.mark.parametrize("synthetic_db", LANDOWNER_SIZES, indirect=True)
+def test_get_project_offer_totals(benchmark, synthetic_db):
+    totals = benchmark(z.get_project_offer_totals)
+    assert (totals["total_offer"] > 0).all()
+
+
+@pytest.mark.parametrize("synthetic_db", LANDOWNER_SIZES, indirect=True)
+def test_recompute_capital_costs(benchmark, synthetic_db):
+    # 全プロジェクトのrWACC・資本コストを作成日時点の市場パラメータで一括再計算
+    totals = z.get_project_offer_totals()
+    conditions = {k: z.PLAN_INPUT_DEFAULTS[k] for k in z.RESULT_SETTING_COLUMNS}
+    recomputed = benchmark(z.recompute_capital_costs, totals, conditions)
+    assert len(recomputed) == len(totals)
+    assert (recomputed["ke_rate"] == z.MARKET_PARAMETER_SEED["ke_rate"]).all()
+
+
+def test_save_project_async_batch(benchmark, temp_db):
+    # 12人が同時に保存した場合: 書き込みスレッドがまとめてコミットするまでの時間
+    landowners = make_landowners(100)
+    area = landowners["面積(坪)"].sum()
+    def save_all():
+        futures = [
+            z.save_project_async(f"PJ_{user}", area, 300.0, 100, landowners, overwrite=True, owner=f"user{user}")
+            for user in range(12)
+        ]
+        return [future.result() for future in futures]
+    project_ids = benchmark(save_all)
+    assert len(set(project_ids)) == 12
+    assert z.count_projects(owner="user0") == 1
+
+
+@pytest.mark.parametrize("synthetic_db", LANDOWNER_SIZES[:2], indirect=True)
+def test_export_portfolio_reports(benchmark, synthetic_db, tmp_path):
+    # 全プロジェクトのExcelレポート+一覧表のzip(毎回空の出力先から作成)
+    totals = z.get_project_offer_totals()
+    conditions = {k: z.PLAN_INPUT_DEFAULTS[k] for k in z.RESULT_SETTING_COLUMNS}
+    dirs = iter(range(1_000))
+    def setup():
+        return ("xlsx", totals, conditions), {"export_dir": str(tmp_path / str(next(dirs)))}
+    zip_path = benchmark.pedantic(z.export_portfolio_reports, setup=setup, rounds=3)
+    with zipfile.ZipFile(zip_path) as archive:
+        assert len(archive.namelist()) == len(totals) + 1
@@ -0,0 +1,556 @@
+"""計算結果の基準値チェック(高速化で結果が変わっていないことを確認する)"""
+import io
+import os
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import zigyokeikaku as z
+from conftest import make_landowners
+
+
+@pytest.mark.parametrize("equity, debt, ke, kd, tax_rate, expected", [
+    (20.0, 80.0, 0.10, 0.028, 0.35, 0.03456),
+    (100.0, 0.0, 0.10, 0.028, 0.35, 0.10),
+    (0.0, 100.0, 0.10, 0.028, 0.35, 0.0182),
+    (0.0, 0.0, 0.10, 0.028, 0.35, 0.0),
+])
+def test_calculate_wacc(equity, debt, ke, kd, tax_rate, expected):
+    assert z.calculate_wacc(equity, debt, ke, kd, tax_rate) == pytest.approx(expected)
+
+
+def test_calculate_wacc_array():
+    rwacc = z.calculate_wacc(np.array([20.0, 0.0]), np.array([80.0, 0.0]), 0.10, 0.028, 0.35)
+    np.testing.assert_allclose(rwacc, [0.03456, 0.0])
+
+
+@pytest.mark.parametrize("equity, debt, rwacc, months, expected", [
+    (3760.0, 15040.0, 0.03456, 6, 324.864),
+    (20.0, 80.0, 0.03456, 12, 3.456),
+    (20.0, 80.0, 0.03456, 0, 0.0),
+])
+def test_calculate_capital_cost(equity, debt, rwacc, months, expected):
+    assert z.calculate_capital_cost(equity, debt, rwacc, months) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("grade, is_solo_pm, expected", [
+    ("PM S2", False, 0.08),
+    ("PM S1", False, 0.10),
+    ("PM A1", False, 0.03),
+    ("PL B5", False, 0.07),
+    ("PL B4", False, 0.07),
+    ("PL B3", False, 0.07),
+    ("PL B2", False, 0.07),
+    ("PM S2", True, 0.15),
+    ("PM S1", True, 0.17),
+    ("PM A1", True, 0.10),
+    ("PL B5", True, 0.07),
+    ("未設定", False, 0.0),
+])
+def test_get_incentive_rate(grade, is_solo_pm, expected):
+    assert z.get_incentive_rate(grade, is_solo_pm) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("grade, is_solo_pm, is_third_party_contract, expected", [
+    ("PM A1", False, True, 0.036),
+    ("PM A1", True, True, 0.12),
+    ("PL B2", False, True, 0.084),
+    ("PM S1", False, True, 0.10),
+    ("PM S1", True, False, 0.17),
+])
+def test_get_adjusted_incentive_rate(grade, is_solo_pm, is_third_party_contract, expected):
+    assert z.get_adjusted_incentive_rate(grade, is_solo_pm, is_third_party_contract) == pytest.approx(expected)
+
+
+def test_incentive_rates_match_scalar():
+    # 一括計算(ブロードキャスト)が1件ずつの計算と一致する
+    grades = ["PM S2", "PM S1", "PM A1", "PL B5", "PL B4", "PL B3", "PL B2", "未設定"]
+    flags = [(s, t) for s in (False, True) for t in (False, True)]
+    grid = z.incentive_rates(
+        np.array(grades, dtype=object)[:, None],
+        np.array([s for s, _ in flags])[None, :],
+        np.array([t for _, t in flags])[None, :],
+    )
+    expected = [[z.get_adjusted_incentive_rate(g, s, t) for s, t in flags] for g in grades]
+    assert grid == pytest.approx(np.array(expected))
+
+
+def test_market_parameter_ranges(temp_db):
+    # 改定日をまたぐ期間は打ち切られ、作成日時ごとにその時点の値が引かれる
+    z.add_market_parameters("2026-07-31", 11.0, 3.0, 34.0, "2026年7月末基準")
+    z.add_market_parameters("2024-07-31", 9.0, 2.5, 35.0, "2024年7月末基準")
+    resolved = z.resolve_market_parameters(["2020-01-01", "2025-07-30 23:59:59", "2025-07-31 00:00:00", "2026-08-01", None])
+    assert resolved["ke_rate"] == pytest.approx([9.0, 9.0, 10.0, 11.0, 11.0])
+    assert z.get_market_parameters()["effective_to"].notna().sum() == 2
+
+
+def test_compute_plan_baseline():
+    # 地権者2名(50坪×220万円、30坪×260万円)・既定条件・PM S1 の画面と同じ値
+    plan = z.compute_plan({"total_area": 80.0, "total_offer": 18800.0, "incentive_rate": 0.10})
+    expected = {
+        "exit_gross": 24000.0,
+        "acquisition_cost": 940.0,
+        "gross_profit_1": 4260.0,
+        "gross_profit_2": 4260.0,
+        "debt_amount": 15040.0,
+        "total_financing_cost": 300.8,
+        "pj_net_profit": 3959.2,
+        "rwacc": 0.03456,
+        "capital_cost": 324.864,
+        "incentive_base_profit": 3935.136,
+        "incentive_amount": 393.5136,
+    }
+    assert {k: plan[k] for k in expected} == pytest.approx(expected)
+
+
+def test_compute_plans_matches_compute_plan():
+    offers = np.array([10000.0, 18800.0, 30000.0])
+    plans = z.compute_plans({"total_area": 80.0, "total_offer": offers, "incentive_rate": 0.10})
+    for i, offer in enumerate(offers):
+        single = z.compute_plan({"total_area": 80.0, "total_offer": offer, "incentive_rate": 0.10})
+        assert {k: v[i] for k, v in plans.items()} == pytest.approx(single)
+
+
+def scalar_plan(p):
+    """画面(main)にあった1件ずつの計算式そのまま(比較用)"""
+    exit_gross = p["total_area"] * p["far"] / 100.0 * p["exit_unit_price"]
+    total_expenses = p["total_offer"] * p["acquisition_cost_rate"] / 100.0 + p["other_expenses_total"]
+    gross_profit_2 = exit_gross - p["total_offer"] - total_expenses - p["brokerage_fee"]
+    debt_amount = p["total_offer"] * p["ltv_rate"] / 100.0
+    total_financing_cost = debt_amount * (p["loan_interest_rate"] / 100.0) * p["project_months"] / 12.0 + debt_amount * p["upfront_rate"] / 100.0
+    pj_net_profit = gross_profit_2 - total_financing_cost
+    equity_amount = p["total_offer"] - debt_amount if p["total_offer"] > debt_amount else 0
+    rwacc = z.calculate_wacc(equity_amount, debt_amount, p["ke_rate"] / 100, p["kd_rate"] / 100, p["tax_rate"] / 100)
+    incentive_base_profit = gross_profit_2 - z.calculate_capital_cost(equity_amount, debt_amount, rwacc, p["project_months"])
+    return {
+        "exit_gross": exit_gross,
+        "gross_profit_2": gross_profit_2,
+        "pj_net_profit": pj_net_profit,
+        "pj_net_profit_rate": pj_net_profit / exit_gross * 100 if exit_gross > 0 else 0,
+        "rwacc": rwacc,
+        "incentive_base_profit": incentive_base_profit,
+        "incentive_amount": incentive_base_profit * p["incentive_rate"] if incentive_base_profit > 0 else 0,
+    }
+
+
+def test_compute_plans_random_inputs_match_scalar():
+    # 全入力項目を乱数で振ったシナリオで、一括計算が1件ずつの計算式と一致する(赤字・LTV100%超も含む)
+    rng = np.random.default_rng(1)
+    n = 200
+    arrays = {
+        "total_area": rng.uniform(10, 500, n),
+        "total_offer": rng.uniform(0, 200_000, n),
+        "far": rng.uniform(100, 600, n),
+        "exit_unit_price": rng.uniform(50, 300, n),
+        "acquisition_cost_rate": rng.uniform(0, 10, n),
+        "other_expenses_total": rng.uniform(0, 5_000, n),
+        "brokerage_fee": rng.uniform(0, 3_000, n),
+        "ltv_rate": rng.uniform(0, 120, n),
+        "loan_interest_rate": rng.uniform(0, 5, n),
+        "upfront_rate": rng.uniform(0, 2, n),
+        "project_months": rng.integers(1, 36, n).astype(float),
+        "ke_rate": rng.uniform(5, 15, n),
+        "kd_rate": rng.uniform(1, 5, n),
+        "tax_rate": rng.uniform(20, 40, n),
+        "incentive_rate": rng.uniform(0, 0.2, n),
+    }
+    plans = z.compute_plans(arrays)
+    for i in range(n):
+        expected = scalar_plan({k: float(v[i]) for k, v in arrays.items()})
+        assert {k: plans[k][i] for k in expected} == pytest.approx(expected)
+
+
+def test_incremental_calc_df_matches_full():
+    # セル編集・編集の取り消し・小数の入力・行追加を順に反映し、毎回全件計算と一致すること
+    landowners = make_landowners(1_000)
+    session = {}
+    edits = [
+        {3: {"提案金額(坪)": 500}},
+        {3: {"提案金額(坪)": 500}, 10: {"面積(坪)": 12.5, "地権者名": "変更"}},
+        {10: {"面積(坪)": 12.5, "地権者名": "変更"}, 20: {"相場金額(坪)": 300.5}},
+        {},
+    ]
+    for edited_rows in edits:
+        edited = landowners.copy()
+        for row, changes in edited_rows.items():
+            for col, value in changes.items():
+                if edited[col].dtype.kind == "i" and not float(value).is_integer():
+                    edited[col] = edited[col].astype(float)
+                edited.iat[row, edited.columns.get_loc(col)] = value
+        calc_df, totals = z.incremental_calc_df(session, landowners, edited, {"edited_rows": edited_rows}, 3.0)
+        expected = z._build_calc_df(edited, 3.0)
+        assert np.allclose(calc_df[list(expected.columns[1:])].to_numpy(dtype=float), expected[list(expected.columns[1:])].to_numpy(dtype=float))
+        assert (calc_df["地権者名"] == expected["地権者名"]).all()
+        for key, col in z.LANDOWNER_TOTAL_COLUMNS.items():
+            assert totals[key] == pytest.approx(expected[col].sum())
+    added = landowners.iloc[[0, 1]]
+    edited = pd.concat([landowners, added], ignore_index=True)
+    calc_df, totals = z.incremental_calc_df(session, landowners, edited, {"edited_rows": {}, "added_rows": [{}, {}]}, 3.0)
+    assert len(calc_df) == 1_002
+    assert totals["total_area"] == pytest.approx(edited["面積(坪)"].sum())
+
+
+def test_simulate_plans_deterministic():
+    # 同じseedなら同じ標本(並列数にもよらない)、seedを変えると標本が変わる。すべて固定なら基準値のまま
+    base = dict(z.PLAN_INPUT_DEFAULTS, total_area=80.0, total_offer=18800.0, incentive_rate=0.10)
+    specs = {
+        "exit_unit_price": {"dist": "正規分布", "spread": 10.0},
+        "project_months": {"dist": "三角分布", "spread": 20.0},
+        "offer_price": {"dist": "一様分布", "spread": 5.0},
+    }
+    owner_offer_gross = np.array([11000.0, 7800.0])
+    n_draws = 2 * z.RISK_MIN_CHUNK_DRAWS + 500
+    first = z.simulate_plans(base, specs, owner_offer_gross, n_draws, seed=7)
+    assert len(first["pj_net_profit"]) == n_draws
+    for other in (z.simulate_plans(base, specs, owner_offer_gross, n_draws, seed=7),
+                  z.simulate_plans(base, specs, owner_offer_gross, n_draws, seed=7, workers=2)):
+        for key, values in first.items():
+            np.testing.assert_array_equal(other[key], values)
+    reseeded = z.simulate_plans(base, specs, owner_offer_gross, n_draws, seed=8)
+    assert not np.array_equal(reseeded["pj_net_profit"], first["pj_net_profit"])
+    fixed = z.simulate_plans(base, {}, owner_offer_gross, 10, seed=7)
+    assert fixed["pj_net_profit"] == pytest.approx(np.full(10, 3959.2))
+
+
+GOAL_BASE = {"total_area": 80.0, "total_offer": 18800.0, "incentive_rate": 0.10}
+
+
+@pytest.mark.parametrize("variable", ["total_offer", "exit_unit_price"])
+@pytest.mark.parametrize("target_metric, target_value", [
+    ("pj_net_profit", 2000.0),
+    ("pj_net_profit_rate", 12.5),
+    ("incentive_amount", 250.0),
+])
+def test_goal_seek_round_trip(variable, target_metric, target_value):
+    # 求めた境界値で計算し直すと、ちょうど目標値になる
+    solution = float(z.solve_goal_seek(GOAL_BASE, target_metric, target_value, variable))
+    assert solution > 0
+    plan = z.compute_plan(dict(GOAL_BASE, **{variable: solution}))
+    assert plan[target_metric] == pytest.approx(target_value)
+
+
+def test_goal_seek_infeasible_and_clamped():
+    # 仕入れ値0でも届かない目標は解なし(NaN)
+    assert np.isnan(z.solve_goal_seek(GOAL_BASE, "pj_net_profit", 30000.0, "total_offer"))
+    # インセンティブ率0ではどの出口単価でもインセンティブは出ない
+    assert np.isnan(z.solve_goal_seek(dict(GOAL_BASE, incentive_rate=0.0), "incentive_amount", 100.0, "exit_unit_price"))
+    # 変数によらず常に満たす目標は、今の値のままで達成(NaNにしない)
+    no_incentive = dict(GOAL_BASE, incentive_rate=0.0)
+    assert z.solve_goal_seek(no_incentive, "incentive_amount", 0.0, "total_offer") == GOAL_BASE["total_offer"]
+    assert z.solve_goal_seek(no_incentive, "incentive_amount", 0.0, "exit_unit_price") == z.PLAN_INPUT_DEFAULTS["exit_unit_price"]
+    # 単価0でも満たす目標は、最低出口一種単価0に切り詰める
+    assert z.solve_goal_seek(GOAL_BASE, "pj_net_profit", -30000.0, "exit_unit_price") == 0.0
+    # 行ごとに一括で解ける(解あり・切り詰め・解なしの混在)
+    arrays = dict(GOAL_BASE, total_area=np.array([80.0, 80.0, 0.0]))
+    solution = z.solve_goal_seek(arrays, "pj_net_profit", np.array([2000.0, -30000.0, 1.0]), "exit_unit_price")
+    assert solution[0] == pytest.approx(float(z.solve_goal_seek(GOAL_BASE, "pj_net_profit", 2000.0, "exit_unit_price")))
+    assert solution[1] == 0.0
+    assert np.isnan(solution[2])
+
+
+def test_irr_known_schedules():
+    cashflows = np.array([
+        [-100.0] + [0.0] * 11 + [110.0],  # 12ヶ月後に1.1倍 → 年率10%
+        [-100.0, 60.0, 60.0] + [0.0] * 10,  # 月次IRR 13.066% (60/(1+r) + 60/(1+r)^2 = 100)
+        [100.0] + [10.0] * 12,  # 符号が変わらない → 解なし
+    ])
+    discount = (-60 + np.sqrt(60 ** 2 + 4 * 60 * 100)) / (2 * 60)  # 60x^2 + 60x - 100 = 0, x = 1/(1+r)
+    monthly = 1 / discount - 1
+    irr = z._irr_bisect(cashflows)
+    assert irr[:2] == pytest.approx([0.10, (1 + monthly) ** 12 - 1])
+    assert np.isnan(irr[2])
+
+
+def test_compute_cashflows_known_schedule():
+    # 売上24,000・仕入れ20,000を0ヶ月目に取得し12ヶ月目に売却。経費なし・LTV50%・金利年12%(月1%複利)
+    arrays = {
+        "total_area": 80.0, "total_offer": 20000.0, "project_months": 12.0, "acquisition_cost_rate": 0.0,
+        "ltv_rate": np.array([0.0, 50.0]), "loan_interest_rate": 12.0, "upfront_rate": 0.0,
+    }
+    cf = z.compute_cashflows(arrays)
+    debt_at_exit = 10000.0 * 1.01 ** 12
+    assert cf["project_irr"] == pytest.approx([0.20, 0.20])
+    assert cf["equity_irr"] == pytest.approx([0.20, (24000.0 - debt_at_exit) / 10000.0 - 1])
+    assert cf["peak_debt"] == pytest.approx([0.0, debt_at_exit])
+    assert cf["compound_interest"] == pytest.approx([0.0, debt_at_exit - 10000.0])
+    # 借入なしは rWACC = ke(10%) で1年割り引く
+    assert cf["npv"][0] == pytest.approx(24000.0 / 1.10 - 20000.0)
+    assert cf["equity_cf"][1, [0, 12]] == pytest.approx([-10000.0, 24000.0 - debt_at_exit])
+
+
+@pytest.mark.parametrize("min_area, budget, required", [
+    (0.0, 0.0, None),
+    (200.0, 0.0, None),
+    (0.0, 20000.0, None),
+    (150.0, 40000.0, [0, 5]),
+    (10_000.0, 0.0, None),  # 全員取得しても届かない
+])
+def test_optimize_parcels_matches_brute_force(min_area, budget, required):
+    # 地権者10名の全組合せ(1024通り)を総当たりした最大のPJ純利益と一致する
+    landowners = make_landowners(10, seed=3)
+    area = landowners["面積(坪)"].to_numpy()
+    price = landowners["提案金額(坪)"].to_numpy(dtype=float)
+    revenue_per_tsubo, unit_cost_factor = 300.0, 1.08
+    mask = np.zeros(10, dtype=bool)
+    if required is not None:
+        mask[required] = True
+    result = z.optimize_parcels(area, price, revenue_per_tsubo, unit_cost_factor, min_area, budget, mask)
+
+    combos = ((np.arange(1024)[:, None] >> np.arange(10)) & 1).astype(bool)
+    ok = (combos | ~mask).all(axis=1) & (combos @ area >= min_area - 1e-9)
+    if budget > 0:
+        ok &= combos @ (area * price) <= budget + 1e-9
+    assert result["feasible"] == ok.any()
+    if ok.any():
+        best = (combos @ result["values"])[ok].max()
+        assert result["values"][result["selected"]].sum() == pytest.approx(best)
+        selected = result["selected"]
+        assert selected[mask].all()
+        assert area[selected].sum() >= min_area - 1e-9
+        assert budget == 0 or (area * price)[selected].sum() <= budget + 1e-9
+
+
+
+def brute_force_parcels(area, price, revenue_per_tsubo, unit_cost_factor, min_area, budget, required):
+    """全組合せの中で条件を満たす限界利益の合計の最大値(解なしは None)"""
+    n = area.size
+    combos = ((np.arange(2 ** n)[:, None] >> np.arange(n)) & 1).astype(bool)
+    ok = (combos | ~required).all(axis=1) & (combos @ area >= min_area - 1e-9)
+    if budget > 0:
+        ok &= combos @ (area * price) <= budget + 1e-9
+    values = area * revenue_per_tsubo - area * price * unit_cost_factor
+    return (combos @ values)[ok].max() if ok.any() else None
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_optimize_parcels_mixed_sizes_match_brute_force(seed):
+    # 0.05坪〜2,000坪の地権者が混在しても(面積を離散化すると小さい地権者が消える規模差)、総当たりと一致する
+    rng = np.random.default_rng(seed)
+    n = 16
+    area = np.round(np.exp(rng.uniform(np.log(0.05), np.log(2_000), n)), 2)
+    price = rng.integers(0, 500, n).astype(float)
+    required = rng.random(n) < 0.1
+    min_area = area.sum() * rng.uniform(0.2, 0.9)
+    budget = (area * price).sum() * rng.uniform(0.3, 1.0)
+    result = z.optimize_parcels(area, price, 300.0, 1.08, min_area, budget, required)
+    best = brute_force_parcels(area, price, 300.0, 1.08, min_area, budget, required)
+    assert result["feasible"] == (best is not None)
+    if best is not None:
+        assert result["exact"]
+        assert result["values"][result["selected"]].sum() == pytest.approx(best, abs=1e-6)
+        # 探索を打ち切っても、上界は最適値以上で、得られる解は最適値以下
+        truncated = z.optimize_parcels(area, price, 300.0, 1.08, min_area, budget, required, max_states=1)
+        assert truncated["upper_bound"] >= best - 1e-6
+        if truncated["feasible"]:
+            assert truncated["values"][truncated["selected"]].sum() <= best + 1e-6
+
+
+def test_optimize_parcels_many_owners_locally_optimal():
+    # 地権者300名・画面の既定条件(最低面積は全体の8割、予算は全員の提案金額)で厳密解となり、
+    # 1名の追加・除外・入れ替えでは改善しない
+    landowners = make_landowners(300, seed=7)
+    area = landowners["面積(坪)"].to_numpy()
+    price = landowners["提案金額(坪)"].to_numpy(dtype=float)
+    min_area, budget = area.sum() * 0.8, (area * price).sum()
+    revenue_per_tsubo, unit_cost_factor = z.parcel_economics(dict(z.PLAN_INPUT_DEFAULTS, far=300.0, exit_unit_price=100.0))
+    result = z.optimize_parcels(area, price, revenue_per_tsubo, unit_cost_factor, min_area, budget)
+    selected, values, costs = result["selected"], result["values"], result["costs"]
+    assert result["exact"]
+    assert result["upper_bound"] == pytest.approx(values[selected].sum())
+    # 1名の追加・除外(取得済みは -1、未取得は +1)と、取得済み1名と未取得1名の入れ替え
+    flips = np.diag(np.where(selected, -1.0, 1.0))
+    out, into = np.flatnonzero(selected), np.flatnonzero(~selected)
+    swaps = np.zeros((out.size * into.size, 300))
+    swaps[np.arange(len(swaps)), np.repeat(out, into.size)] = -1.0
+    swaps[np.arange(len(swaps)), np.tile(into, out.size)] = 1.0
+    for moves in (flips, swaps):
+        new_area = area[selected].sum() + moves @ area
+        new_cost = costs[selected].sum() + moves @ costs
+        ok = (new_area >= min_area - 1e-9) & (new_cost <= budget + 1e-9)
+        assert ((moves @ values)[ok] <= 1e-6).all()
+
+
+def landowner_register(n=25):
+    """㎡・円/㎡ で書かれた台帳(3桁区切りの文字列、空行・名前なし行・変換できない値を含む)"""
+    rng = np.random.default_rng(4)
+    sqm = rng.uniform(20, 300, n).round(2)
+    yen = rng.integers(500_000, 1_500_000, n)
+    register = pd.DataFrame({
+        "所有者": [f"所有者{i}" for i in range(n)],
+        "地積(㎡)": sqm,
+        "相場単価(円/㎡)": [f"{v:,}" for v in yen],
+        "提案単価(円/㎡)": [f"{v + 100_000:,}" for v in yen],
+        "備考": "",
+    })
+    extra = pd.DataFrame([
+        {"所有者": None, "地積(㎡)": None, "相場単価(円/㎡)": None, "提案単価(円/㎡)": None},
+        {"所有者": None, "地積(㎡)": 10.0, "相場単価(円/㎡)": "1,000", "提案単価(円/㎡)": "1,000"},
+        {"所有者": "面積不明", "地積(㎡)": "不明", "相場単価(円/㎡)": "1,000,000", "提案単価(円/㎡)": "1,000,000"},
+    ])
+    return pd.concat([register, extra], ignore_index=True), sqm, yen
+
+
+@pytest.mark.parametrize("ext", [".csv", ".xlsx"])
+@pytest.mark.parametrize("chunksize", [7, z.LANDOWNER_IMPORT_CHUNK_ROWS])
+def test_import_landowner_register(ext, chunksize):
+    register, sqm, yen = landowner_register()
+    buffer = io.BytesIO()
+    if ext == ".csv":
+        buffer.write(register.to_csv(index=False).encode("cp932"))
+    else:
+        register.to_excel(buffer, index=False)
+    raw = z.read_landowner_register(buffer.getvalue(), f"台帳{ext}", chunksize=chunksize)
+    assert len(raw) == len(register)
+
+    mapping, area_unit, price_unit = z.guess_landowner_mapping(raw.columns)
+    assert mapping == {"地権者名": "所有者", "面積(坪)": "地積(㎡)", "相場金額(坪)": "相場単価(円/㎡)", "提案金額(坪)": "提案単価(円/㎡)"}
+    assert (area_unit, price_unit) == ("㎡", "円/㎡")
+
+    imported, report = z.coerce_landowner_frame(raw, mapping, area_unit, price_unit)
+    assert imported["地権者名"].tolist() == [f"所有者{i}" for i in range(25)] + ["面積不明"]
+    assert imported["面積(坪)"].to_numpy()[:25] == pytest.approx(sqm / z.SQM_PER_TSUBO)
+    np.testing.assert_array_equal(imported["相場金額(坪)"].to_numpy()[:25], (yen * z.SQM_PER_TSUBO * 1e-4).round())
+    np.testing.assert_array_equal(imported["提案金額(坪)"].to_numpy()[:25], ((yen + 100_000) * z.SQM_PER_TSUBO * 1e-4).round())
+    assert report == {
+        "読込行数": 28, "取込行数": 26, "空行(除外)": 1, "地権者名なし(除外)": 1, "面積0以下": 1,
+        "数値変換不可:面積(坪)": 1, "数値変換不可:相場金額(坪)": 0, "数値変換不可:提案金額(坪)": 0,
+    }
+
+
+def save_version(label, landowners, exit_unit_price, parent_id=None):
+    inputs = dict(GOAL_BASE, total_area=landowners["面積(坪)"].sum(), exit_unit_price=exit_unit_price,
+                  total_offer=(landowners["面積(坪)"] * landowners["提案金額(坪)"]).sum())
+    results = dict(inputs, **z.compute_plan(inputs), grade="PM S1", is_solo_pm=False, is_third_party_contract=False)
+    return z.save_project_version("版管理", label, inputs["total_area"], 300.0, exit_unit_price, landowners, results, parent_id)
+
+
+def test_version_save_diff_restore(temp_db):
+    # 同名の地権者を含む台帳で、変更・削除・追加した版との差分と、初版への復元を確認する
+    first = make_landowners(30, seed=5)
+    first.loc[5, "地権者名"] = first.loc[4, "地権者名"]
+    project_id, v1 = save_version("初版", first, 100.0)
+    second = pd.concat([first.drop(index=1), make_landowners(1, seed=6).assign(地権者名="追加地権者")], ignore_index=True)
+    second.loc[0, "提案金額(坪)"] += 10
+    _, v2 = save_version("第2版", second, 110.0)
+
+    pl_diff, param_diff, landowner_diff = z.compare_versions(v1, v2)
+    assert param_diff["条件"].tolist() == ["出口一種単価"]
+    assert sorted(landowner_diff["区分"]) == ["削除", "変更", "追加"]
+    changed = landowner_diff[landowner_diff["区分"] == "変更"].iloc[0]
+    assert changed["提案金額(グロス) 差額"] == pytest.approx(first.loc[0, "面積(坪)"] * 10)
+    pl = pl_diff.set_index("項目")
+    assert pl.loc["売上", "A"] == pytest.approx(first["面積(坪)"].sum() * 3 * 100)
+    assert pl.loc["売上", "B"] == pytest.approx(second["面積(坪)"].sum() * 3 * 110)
+    assert (pl["差額(B-A)"] == pl["B"] - pl["A"]).all()
+
+    # 初版の内容を最新版として保存し直すと、差分3行だけで初版と同じ地権者・条件に戻る
+    restored, params = z.load_version(v1)
+    _, v3 = save_version("初版に戻す", z.landowners_to_input_df(restored), params["exit_unit_price"])
+    state, params = z.load_version(v3)
+    pd.testing.assert_frame_equal(z.landowners_to_input_df(state), first, check_dtype=False)
+    assert params["exit_unit_price"] == 100.0
+    versions = z.get_project_versions(project_id).set_index("id")
+    assert versions.loc[v3, "parent_id"] == v2
+    assert versions.loc[v3, "delta_rows"] == 3
+    assert z.compare_versions(v1, v3)[2].empty
+
+
+def test_version_reorder_and_blank_cells_are_not_changes(temp_db):
+    # 同名の地権者の並べ替えと、空欄(NaN)のままのセルは差分にならない
+    first = make_landowners(6, seed=7).assign(地権者名=["甲", "甲", "甲", "乙", "乙", "丙"])
+    first.loc[[1, 4], "相場金額(坪)"] = np.nan
+    project_id, v1 = save_version("初版", first, 100.0)
+    _, v2 = save_version("並べ替え", first.iloc[[2, 0, 1, 5, 4, 3]], 100.0)
+    versions = z.get_project_versions(project_id).set_index("id")
+    assert versions.loc[v2, "delta_rows"] == 0
+    assert z.compare_versions(v1, v2)[2].empty
+    # 並べ替えと同時に1行だけ変えると、その行だけが変更になる
+    edited = first.iloc[[1, 0, 2, 3, 4, 5]].copy()
+    edited.iloc[0, 3] += 10
+    _, v3 = save_version("1行変更", edited, 100.0)
+    assert z.get_project_versions(project_id).set_index("id").loc[v3, "delta_rows"] == 1
+    landowner_diff = z.compare_versions(v2, v3)[2]
+    assert landowner_diff["区分"].tolist() == ["変更"]
+    assert landowner_diff["提案金額(グロス) 差額"].iloc[0] == pytest.approx(first.loc[1, "面積(坪)"] * 10)
+
+
+@pytest.mark.parametrize("input_ext", [".csv", ".parquet", ".xlsx"])
+@pytest.mark.parametrize("output_ext", [".csv", ".parquet", ".xlsx"])
+def test_run_batch_mixed_chunks(tmp_path, input_ext, output_ext):
+    # 備考が最初のチャンクでは空欄・後のチャンクで文字列、IDが0始まり、フラグが後で空欄になっても通す
+    n = 120
+    scenarios = pd.DataFrame({
+        "scenario_id": [f"{i:04d}" for i in range(n)],
+        "total_area": np.full(n, 80.0),
+        "total_offer": np.where(np.arange(n) < 100, 18800.0, np.nan),
+        "grade": "PM S1",
+        "is_solo_pm": [False] * 60 + [None] * 60,
+        "memo": [None] * 50 + [f"メモ{i}" for i in range(50, n)],
+    })
+    input_path = tmp_path / f"scenarios{input_ext}"
+    if input_ext == ".csv":
+        scenarios.to_csv(input_path, index=False)
+    elif input_ext == ".parquet":
+        scenarios.to_parquet(input_path, index=False)
+    else:
+        scenarios.to_excel(input_path, index=False)
+    output_path = tmp_path / f"results{output_ext}"
+    assert z.run_batch(str(input_path), str(output_path), chunksize=50) == n
+
+    if output_ext == ".csv":
+        results = pd.read_csv(output_path, dtype={"scenario_id": str, "memo": str}, encoding="utf-8-sig")
+    elif output_ext == ".parquet":
+        results = pd.read_parquet(output_path)
+    else:
+        results = pd.read_excel(output_path, dtype={"scenario_id": str, "memo": str})
+    assert results["scenario_id"].tolist() == scenarios["scenario_id"].tolist()
+    assert results["memo"].isna().sum() == 50
+    assert results["memo"].iloc[-1] == "メモ119"
+    assert results["pj_net_profit"].iloc[0] == pytest.approx(3959.2)
+    assert results["incentive_amount"].iloc[0] == pytest.approx(393.5136)
+
+
+def test_profiler_stops_tracemalloc_after_traced_run():
+    assert not tracemalloc.is_tracing()
+    profiler = z._Profiler()
+    profiler.begin_run(True, trace_memory=True)
+    with profiler.measure("section", "確保"):
+        buffer = bytearray(1 << 20)
+    assert profiler.records()[0]["memory_bytes"] >= len(buffer)
+    # 別スレッド(別セッション)の計測が終わっても、計測中の実行が残る間は止めない
+    other = threading.Thread(target=lambda: (profiler.begin_run(True, trace_memory=True), profiler.end_run()))
+    other.start()
+    other.join()
+    assert tracemalloc.is_tracing()
+    profiler.end_run()
+    assert not tracemalloc.is_tracing()
+    # 外で開始されたtracemallocは止めない
+    tracemalloc.start()
+    try:
+        profiler.begin_run(True, trace_memory=True)
+        profiler.end_run()
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+
+def test_prune_exports_keeps_reused_reports(tmp_path):
+    # 最終利用から保存期間を過ぎたファイルだけを消し、作成済みを再利用したレポートは消さない
+    export_dir = tmp_path / "exports"
+    inputs = dict(z.PLAN_INPUT_DEFAULTS, total_area=80.0, total_offer=18800.0)
+    plan = z.compute_plan(inputs)
+    path = z.export_project_report("xlsx", "期限", inputs, plan, export_dir=str(export_dir))
+    stale = export_dir / "projects" / "old.xlsx"
+    stale.parent.mkdir()
+    stale.write_bytes(b"old")
+    expired = time.time() - z.EXPORT_MAX_AGE_SECONDS - 60
+    for p in (path, stale):
+        os.utime(p, (expired, expired))
+    assert z.export_project_report("xlsx", "期限", inputs, plan, export_dir=str(export_dir)) == path
+    assert z.prune_exports(str(export_dir)) == 1
+    assert os.path.exists(path) and not stale.exists()
+    assert z.prune_exports(str(tmp_path / "missing")) == 0
@@ -0,0 +1,100 @@
+"""保存先(メモリ上のSQLite / BIZPLAN_DB_URL)ごとの保存・読み込み・上書きの往復チェック"""
+import uuid
+
+import pandas as pd
+import pytest
+
+import zigyokeikaku as z
+from conftest import make_landowners
+
+
+def plan_results(landowners, **inputs):
+    """画面の保存と同じ形の結果dict(計算条件・PL項目・等級)"""
+    inputs = dict(z.PLAN_INPUT_DEFAULTS, total_area=landowners["面積(坪)"].sum(),
+                  total_offer=(landowners["面積(坪)"] * landowners["提案金額(坪)"]).sum(), **inputs)
+    return dict(inputs, **z.compute_plan(inputs), grade="A", is_solo_pm=False, is_third_party_contract=False)
+
+
+def save(name, landowners, owner, **kwargs):
+    results = plan_results(landowners, exit_unit_price=kwargs.pop("exit_unit_price", 100.0))
+    project_id = z.save_project(name, results["total_area"], results["far"], results["exit_unit_price"],
+                                landowners, results=results, owner=owner, **kwargs)
+    return project_id, results
+
+
+def load_landowners(project_id):
+    return z.landowners_to_input_df(z.get_landowners_by_project(project_id).sort_values("id"))
+
+
+@pytest.fixture
+def workspace(db_url):
+    """テストごとの担当者名(外部DBに残さないよう、終了時にそのワークスペースのプロジェクトを削除)"""
+    owner = f"bench-{uuid.uuid4().hex}"
+    yield owner
+    projects = z.get_all_projects(owner)
+    for project_id in projects.loc[projects["owner"] == owner, "id"]:
+        z.delete_project(int(project_id), owner)
+
+
+def test_save_and_load(workspace):
+    landowners = make_landowners(50)
+    project_id, results = save("往復", landowners, workspace)
+    pd.testing.assert_frame_equal(load_landowners(project_id), landowners, check_dtype=False)
+    saved = z.get_project_offer_totals(workspace).set_index("id").loc[project_id]
+    assert saved["total_offer"] == pytest.approx(results["total_offer"])
+    assert saved["saved_rwacc"] == pytest.approx(results["rwacc"])
+
+
+def test_overwrite_upserts(workspace):
+    project_id, _ = save("上書き", make_landowners(50), workspace)
+    landowners = make_landowners(20, seed=1)
+    overwritten_id, results = save("上書き", landowners, workspace, overwrite=True, exit_unit_price=120.0)
+    assert overwritten_id == project_id
+    pd.testing.assert_frame_equal(load_landowners(project_id), landowners, check_dtype=False)
+    projects = z.get_all_projects(workspace)
+    assert (projects["name"] == "上書き").sum() == 1
+    top = z.get_top_projects(owner=workspace).set_index("name")
+    assert top.loc["上書き", "exit_gross"] == pytest.approx(results["exit_gross"])
+
+    z.save_project_results_bulk(pd.DataFrame({"project_id": [project_id], "pj_net_profit": [1.0]}))
+    top = z.get_top_projects(owner=workspace).set_index("name")
+    assert top.loc["上書き", "pj_net_profit"] == pytest.approx(1.0)
+    assert top.loc["上書き", "exit_gross"] == pytest.approx(results["exit_gross"])
+
+
+def test_version_round_trip(workspace):
+    first = make_landowners(30)
+    results = plan_results(first)
+    _, v1 = z.save_project_version("版", "初版", results["total_area"], 300.0, 100, first, results, owner=workspace)
+    second = pd.concat([first.drop(index=1), make_landowners(1, seed=2).assign(地権者名="追加地権者")], ignore_index=True)
+    second.loc[0, "提案金額(坪)"] += 10
+    results = plan_results(second, exit_unit_price=110.0)
+    project_id, v2 = z.save_project_version("版", "第2版", results["total_area"], 300.0, 110, second, results, owner=workspace)
+    for version_id, expected, exit_unit_price in [(v1, first, 100), (v2, second, 110)]:
+        state, params = z.load_version(version_id)
+        restored = z.landowners_to_input_df(state)
+        pd.testing.assert_frame_equal(restored, expected, check_dtype=False)
+        assert params["exit_unit_price"] == exit_unit_price
+    # 第2版は変更・追加・削除の3行だけを差分として持つ
+    versions = z.get_project_versions(project_id).set_index("id")
+    assert versions.loc[v2, "delta_rows"] == 3
+    pd.testing.assert_frame_equal(load_landowners(project_id), second, check_dtype=False)
+
+
+def test_delete_owned_only(workspace):
+    project_id, _ = save("削除", make_landowners(10), workspace)
+    assert not z.delete_project(project_id, f"{workspace}-other")
+    assert not z.delete_project(project_id)
+    assert z.delete_project(project_id, workspace)
+    assert z.get_landowners_by_project(project_id).empty
+
+
+def test_sqlite_url_applies_pragmas(tmp_path):
+    # SQLiteファイルのURLでも、既定の保存先と同じWAL・busy_timeout・synchronousで接続する
+    pytest.importorskip("sqlalchemy")
+    backend = z._SQLAlchemyBackend(f"sqlite:///{tmp_path / 'pragmas.db'}")
+    with backend.engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == z.DB_BUSY_TIMEOUT_MS
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+    backend.engine.dispose()
@@ -0,0 +1,70 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import zigyokeikaku as z  # noqa: E402
+
+# 外部DB(BIZPLAN_DB_URL)は db_url フィクスチャのテストだけで使い、他のテストはSQLiteファイルで動かす
+EXTERNAL_DB_URL = os.environ.pop(z.DB_URL_ENV, None)
+
+# 合成データの地権者数(10件〜10万件)
+LANDOWNER_SIZES = [10, 1_000, 100_000]
+LANDOWNERS_PER_PROJECT = 100
+
+
+def make_landowners(n, seed=0):
+    """地権者入力表と同じ列・型の合成データ"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "地権者名": [f"地権者{i}" for i in range(n)],
+        "面積(坪)": rng.uniform(5, 80, n).round(2),
+        "相場金額(坪)": rng.integers(150, 400, n),
+        "提案金額(坪)": rng.integers(150, 450, n),
+    })
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """空のSQLiteデータベースに切り替える"""
+    monkeypatch.setattr(z, "DB_NAME", str(tmp_path / "bench.db"))
+    z.init_db()
+    return z.DB_NAME
+
+
+@pytest.fixture(params=["sqlite://", EXTERNAL_DB_URL], ids=["sqlite-memory", "BIZPLAN_DB_URL"])
+def db_url(request, monkeypatch):
+    """SQLAlchemy経由の保存先に切り替える(メモリ上のSQLiteと、設定されていれば BIZPLAN_DB_URL)"""
+    if request.param is None:
+        pytest.skip(f"{z.DB_URL_ENV} が未設定")
+    pytest.importorskip("sqlalchemy")
+    monkeypatch.setenv(z.DB_URL_ENV, request.param)
+    z.init_db()
+    return request.param
+
+
+@pytest.fixture(scope="session")
+def synthetic_dbs(tmp_path_factory):
+    """地権者数ごとの合成データベース(1プロジェクトあたり最大100件)"""
+    paths = {}
+    for n in LANDOWNER_SIZES:
+        path = str(tmp_path_factory.mktemp(f"db{n}") / "bench.db")
+        z.DB_NAME = path
+        landowners = make_landowners(n)
+        for start in range(0, n, LANDOWNERS_PER_PROJECT):
+            chunk = landowners.iloc[start:start + LANDOWNERS_PER_PROJECT]
+            z.save_project(f"合成PJ_{start // LANDOWNERS_PER_PROJECT}", chunk["面積(坪)"].sum(), 300.0, 100, chunk)
+        paths[n] = path
+    z.DB_NAME = "biz_plan.db"
+    return paths
+
+
+@pytest.fixture
+def synthetic_db(request, synthetic_dbs, monkeypatch):
+    """パラメータの地権者数の合成データベースに切り替える"""
+    monkeypatch.setattr(z, "DB_NAME", synthetic_dbs[request.param])
+    return request.param